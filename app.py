@@ -1,27 +1,95 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, jsonify, abort, make_response,
+                   get_flashed_messages)
 import os
 import json
+import hashlib
+import logging
 import PyPDF2
+from PyPDF2.errors import PdfReadError
+from PyPDF2.generic import ArrayObject
 import docx
-from datetime import datetime
+from datetime import datetime, timezone
 import re
 from werkzeug.utils import secure_filename
 #import openai
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from guardrails import AnalysisBudget, ResourceUsage
+from database import AnalysisDatabase
+from cache import LRUCache
+from prompts import PromptBuilder, normalize_profile
+from validators import RFPValidator
+from config import Config
 
 app = Flask(__name__)
+
+# Per-request resource usage is logged at INFO level (see guardrails.py)
+logging.basicConfig(level=logging.INFO)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
-app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['UPLOAD_FOLDER'] = Config.UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Resource limits applied to each analysis request
+app.config['ANALYSIS_MAX_PAGES'] = Config.ANALYSIS_MAX_PAGES
+app.config['ANALYSIS_MAX_CHARS'] = Config.ANALYSIS_MAX_CHARS  # Default matches RFPValidator's 500KB text limit
+app.config['EXTRACTION_TIME_BUDGET'] = Config.EXTRACTION_TIME_BUDGET  # Seconds
+app.config['ANALYSIS_TIME_BUDGET'] = Config.ANALYSIS_TIME_BUDGET  # Seconds
+
+# Persistence and caching of analysis results
+app.config['DATABASE_PATH'] = Config.DATABASE_PATH
+app.config['ANALYSIS_CACHE_MAX_AGE'] = 3600  # Seconds; stored analyses never change
+app.config['ANALYSIS_FRAGMENT_CACHE_SIZE'] = 256
+
+# Server-side prompt generation
+app.config['PROMPT_CACHE_SIZE'] = 1024
+app.config['PROMPT_BATCH_LIMIT'] = 500
+
+# ASGI serving mode (see asgi.py): analyses run in a bounded worker pool
+app.config['ASGI_ANALYSIS_WORKERS'] = os.cpu_count() or 2
+app.config['ASGI_ANALYSIS_QUEUE'] = 16  # Requests allowed to wait for a worker
+app.config['ASGI_MAX_CONCURRENT_UPLOADS'] = 64  # Upload bodies being received at once
+app.config['ASGI_USE_PROCESSES'] = True
+
+# Tiered extraction: 'quick' reads the leading PDF pages plus pages whose content
+# streams mention deadlines, funding or eligibility, falling back to 'full'
+app.config['EXTRACTION_TIER'] = 'full'
+app.config['QUICK_TIER_LEADING_PAGES'] = 3
+app.config['QUICK_TIER_MAX_PAGES'] = 20
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
+EXTRACTION_TIERS = {'quick', 'full'}
+
+# Cheap byte-level scan of PDF content streams for pages worth extracting in the quick tier
+QUICK_TIER_KEYWORDS = re.compile(
+    rb'deadline|due\s+(?:date|by)|submi(?:t|ssion)|fund|award|grant|eligib|budget|\$\s*\d',
+    re.IGNORECASE
+)
 
 # Create uploads directory if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Rendered analysis bodies keyed by (database path, analysis id)
+analysis_fragment_cache = LRUCache(app.config['ANALYSIS_FRAGMENT_CACHE_SIZE'])
+_databases = {}
+
+# Section prompt template is compiled once and shared by every request
+prompt_builder = PromptBuilder(app.jinja_env.get_template('prompts/section_prompt.txt'),
+                               cache_size=app.config['PROMPT_CACHE_SIZE'])
+
 class RFPAnalyzer:
-    def __init__(self):
+    def __init__(self, max_pages: Optional[int] = None, max_chars: Optional[int] = None,
+                 budget: Optional[AnalysisBudget] = None, quick_leading_pages: int = 3,
+                 quick_max_pages: int = 20):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.budget = budget
+        self.quick_leading_pages = quick_leading_pages
+        self.quick_max_pages = quick_max_pages
+        self.truncation_reasons = []
+        self.extraction_tier = 'full'
+        # Extracted PDF page text keyed by (file path, page number), so a full
+        # pass after a quick one does not extract the same pages twice
+        self.page_text_cache: Dict[Tuple[str, int], str] = {}
         self.requirements_template = {
             'eligibility': [],
             'geographic': [],
@@ -31,29 +99,127 @@ class RFPAnalyzer:
             'documents': []
         }
     
-    def extract_text_from_file(self, file_path: str) -> str:
-        """Extract text from uploaded file based on extension"""
-        text = ""
+    def _truncate(self, reason: str):
+        """Record why the extracted text or analysis is incomplete"""
+        if reason not in self.truncation_reasons:
+            self.truncation_reasons.append(reason)
+    
+    def _should_stop_extraction(self, length: int) -> bool:
+        """Check character cap and extraction time budget between pages/paragraphs"""
+        if self.max_chars is not None and length >= self.max_chars:
+            self._truncate(f"character limit of {self.max_chars} reached")
+            return True
+        if self.budget is not None and self.budget.expired():
+            self._truncate("extraction time budget exceeded")
+            return True
+        return False
+    
+    def page_content_bytes(self, page) -> bytes:
+        """Raw (decompressed) content stream bytes of a PDF page, without text extraction"""
+        contents = page.get_contents()
+        if contents is None:
+            return b''
+        if isinstance(contents, ArrayObject):
+            # /Contents may be an array of streams that together form the page
+            return b"\n".join(stream.get_object().get_data() for stream in contents)
+        return contents.get_data()
+    
+    def select_quick_pages(self, pdf_reader, limit: int) -> List[int]:
+        """Pick the leading pages plus pages whose content streams match key terms.
+        
+        Every page is scanned, so key terms beyond the page cap are still found;
+        at most ``limit`` pages are selected.
+        """
+        page_count = len(pdf_reader.pages)
+        selected = list(range(min(self.quick_leading_pages, page_count, limit)))
+        for page_number in range(len(selected), page_count):
+            if len(selected) >= limit or (self.budget is not None and self.budget.expired()):
+                break
+            try:
+                data = self.page_content_bytes(pdf_reader.pages[page_number])
+            except (PdfReadError, NotImplementedError):
+                # Streams we cannot decode cheaply are kept rather than silently dropped
+                selected.append(page_number)
+                continue
+            if QUICK_TIER_KEYWORDS.search(data):
+                selected.append(page_number)
+        return selected
+    
+    def needs_full_extraction(self, analysis: Dict, min_signals: int = 2) -> bool:
+        """Check whether a quick-tier analysis found too little to stand on its own"""
+        requirements = analysis['requirements']
+        signals = [
+            analysis['funding_amount'] != "Amount not specified",
+            bool(requirements['timeline']),
+            bool(requirements['eligibility']),
+            bool(requirements['financial']),
+        ]
+        return sum(signals) < min_signals
+    
+    def extract_text_from_file(self, file_path: str, quick: bool = False) -> str:
+        """Extract text from uploaded file based on extension.
+        
+        With quick=True, long PDFs are only partially extracted (see select_quick_pages).
+        """
+        parts = []
+        length = 0
         file_extension = file_path.lower().split('.')[-1]
+        self.extraction_tier = 'full'
+        if self.budget is not None:
+            self.budget.start('extraction')
         
         try:
             if file_extension == 'pdf':
                 with open(file_path, 'rb') as file:
                     pdf_reader = PyPDF2.PdfReader(file)
-                    for page in pdf_reader.pages:
-                        text += page.extract_text() + "\n"
+                    page_total = len(pdf_reader.pages)
+                    page_limit = page_total if self.max_pages is None else min(page_total, self.max_pages)
+                    quick_limit = min(self.quick_max_pages, page_limit)
+                    
+                    # Scanning only pays off when it can skip most of the pages
+                    if quick and page_total > 2 * quick_limit:
+                        page_numbers = self.select_quick_pages(pdf_reader, quick_limit)
+                        self.extraction_tier = 'quick'
+                        self._truncate(f"quick tier: {len(page_numbers)} of {page_total} pages extracted")
+                    else:
+                        if page_limit < page_total:
+                            self._truncate(f"page limit of {self.max_pages} reached")
+                        # Pages kept by an earlier quick pass over this file are included too
+                        extracted = {number for path, number in self.page_text_cache if path == file_path}
+                        page_numbers = sorted(set(range(page_limit)) | extracted)
+                    
+                    for page_number in page_numbers:
+                        if self._should_stop_extraction(length):
+                            break
+                        key = (file_path, page_number)
+                        if key not in self.page_text_cache:
+                            self.page_text_cache[key] = pdf_reader.pages[page_number].extract_text() + "\n"
+                        page_text = self.page_text_cache[key]
+                        parts.append(page_text)
+                        length += len(page_text)
             
             elif file_extension == 'docx':
                 doc = docx.Document(file_path)
                 for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n"
+                    if self._should_stop_extraction(length):
+                        break
+                    parts.append(paragraph.text + "\n")
+                    length += len(paragraph.text) + 1
             
             elif file_extension == 'txt':
                 with open(file_path, 'r', encoding='utf-8') as file:
-                    text = file.read()
+                    if self.max_chars is None:
+                        parts.append(file.read())
+                    else:
+                        parts.append(file.read(self.max_chars + 1))
             
         except Exception as e:
             print(f"Error extracting text: {str(e)}")
+        
+        text = "".join(parts)
+        if self.max_chars is not None and len(text) > self.max_chars:
+            text = text[:self.max_chars]
+            self._truncate(f"character limit of {self.max_chars} reached")
             
         return text
     
@@ -64,10 +230,10 @@ class RFPAnalyzer:
         # Common patterns for financial requirements
         patterns = [
             r'\$[\d,]+(?:\s*-\s*\$[\d,]+)?',  # Dollar amounts
-            r'(?:minimum|maximum|range).*?(?:\$[\d,]+|\d+%)',
-            r'budget.*?(?:\$[\d,]+|\d+%)',
-            r'matching.*?funds?',
-            r'(?:cannot exceed|must not exceed).*?(?:\$[\d,]+|\d+%)',
+            r'(?:minimum|maximum|range).{0,200}?(?:\$[\d,]+|\d+%)',
+            r'budget.{0,200}?(?:\$[\d,]+|\d+%)',
+            r'matching.{0,200}?funds?',
+            r'(?:cannot exceed|must not exceed).{0,200}?(?:\$[\d,]+|\d+%)',
         ]
         
         for pattern in patterns:
@@ -87,10 +253,10 @@ class RFPAnalyzer:
         
         # Patterns for dates and deadlines
         date_patterns = [
-            r'(?:deadline|due|submit|application).*?(?:by|on|before).*?(?:\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+ \d{1,2}, \d{4})',
-            r'(?:award|announcement|notification).*?(?:\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+ \d{1,2}, \d{4})',
-            r'(?:program period|grant period|project period).*?(?:\d{4}.*?\d{4})',
-            r'(?:reporting|report).*?(?:due|deadline).*?(?:\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+ \d{1,2}, \d{4})',
+            r'(?:deadline|due|submit|application).{0,200}?(?:by|on|before).{0,200}?(?:\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+ \d{1,2}, \d{4})',
+            r'(?:award|announcement|notification).{0,200}?(?:\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+ \d{1,2}, \d{4})',
+            r'(?:program period|grant period|project period).{0,200}?(?:\d{4}.{0,200}?\d{4})',
+            r'(?:reporting|report).{0,200}?(?:due|deadline).{0,200}?(?:\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}|\w+ \d{1,2}, \d{4})',
         ]
         
         for pattern in date_patterns:
@@ -106,10 +272,10 @@ class RFPAnalyzer:
         
         # Common eligibility patterns
         patterns = [
-            r'(?:must be|required to be|eligible).*?(?:501\(c\)\(3\)|nonprofit|tax-exempt)',
-            r'(?:serve|target|focus on).*?(?:youth|students|ages? \d+-\d+)',
-            r'(?:located in|serve|operate in).*?(?:county|counties|state|region)',
-            r'(?:minimum|maximum).*?(?:budget|revenue|staff|experience)',
+            r'(?:must be|required to be|eligible).{0,200}?(?:501\(c\)\(3\)|nonprofit|tax-exempt)',
+            r'(?:serve|target|focus on).{0,200}?(?:youth|students|ages? \d+-\d+)',
+            r'(?:located in|serve|operate in).{0,200}?(?:county|counties|state|region)',
+            r'(?:minimum|maximum).{0,200}?(?:budget|revenue|staff|experience)',
         ]
         
         for pattern in patterns:
@@ -123,22 +289,34 @@ class RFPAnalyzer:
         
         return list(set(eligibility_items))[:8]  # Remove duplicates and limit
     
+    def _run_stage(self, extractor, text: str, default):
+        """Run a single extractor unless the analysis time budget has run out"""
+        if self.budget is not None and self.budget.expired():
+            self._truncate("analysis time budget exceeded")
+            return default
+        return extractor(text)
+    
     def analyze_rfp(self, text: str) -> Dict:
         """Main analysis function that processes RFP text"""
+        if self.budget is not None:
+            self.budget.start('analysis')
+        
         analysis = {
-            'title': self.extract_title(text),
-            'organization': self.extract_organization(text),
-            'funding_amount': self.extract_funding_amount(text),
+            'title': self._run_stage(self.extract_title, text, "RFP Document"),
+            'organization': self._run_stage(self.extract_organization, text, "Organization"),
+            'funding_amount': self._run_stage(self.extract_funding_amount, text, "Amount not specified"),
             'requirements': {
-                'eligibility': self.parse_eligibility(text),
-                'financial': self.parse_financial_requirements(text),
-                'timeline': self.parse_timeline(text),
-                'geographic': self.extract_geographic_requirements(text),
-                'focus_areas': self.extract_focus_areas(text),
-                'documents': self.extract_document_requirements(text)
+                'eligibility': self._run_stage(self.parse_eligibility, text, []),
+                'financial': self._run_stage(self.parse_financial_requirements, text, []),
+                'timeline': self._run_stage(self.parse_timeline, text, []),
+                'geographic': self._run_stage(self.extract_geographic_requirements, text, []),
+                'focus_areas': self._run_stage(self.extract_focus_areas, text, []),
+                'documents': self._run_stage(self.extract_document_requirements, text, [])
             },
-            'application_sections': self.extract_application_sections(text),
-            'success_tips': self.extract_success_tips(text)
+            'application_sections': self._run_stage(self.extract_application_sections, text, []),
+            'success_tips': self._run_stage(self.extract_success_tips, text, []),
+            'truncated': bool(self.truncation_reasons),
+            'truncation_reasons': list(self.truncation_reasons)
         }
         
         return analysis
@@ -171,7 +349,7 @@ class RFPAnalyzer:
         patterns = [
             r'\$[\d,]+(?:\s*-\s*\$[\d,]+)?\s*(?:total|available|per\s+grant)',
             r'up to \$[\d,]+',
-            r'maximum.*?\$[\d,]+',
+            r'maximum.{0,200}?\$[\d,]+',
         ]
         
         for pattern in patterns:
@@ -185,9 +363,9 @@ class RFPAnalyzer:
         """Extract geographic/location requirements"""
         geo_items = []
         patterns = [
-            r'(?:serve|located in|operate in).*?(?:county|counties|state|region|area)',
-            r'(?:California|New York|Texas|Florida).*?(?:county|counties)',
-            r'(?:urban|rural|suburban).*?(?:areas|communities)',
+            r'(?:serve|located in|operate in).{0,200}?(?:county|counties|state|region|area)',
+            r'(?:California|New York|Texas|Florida).{0,200}?(?:county|counties)',
+            r'(?:urban|rural|suburban).{0,200}?(?:areas|communities)',
         ]
         
         for pattern in patterns:
@@ -203,8 +381,8 @@ class RFPAnalyzer:
         
         # Look for common focus area indicators
         patterns = [
-            r'(?:focus|priority|pillar|area).*?(?:education|health|environment|community|youth)',
-            r'(?:support|funding for).*?(?:programs|initiatives|projects)',
+            r'(?:focus|priority|pillar|area).{0,200}?(?:education|health|environment|community|youth)',
+            r'(?:support|funding for).{0,200}?(?:programs|initiatives|projects)',
         ]
         
         for pattern in patterns:
@@ -220,9 +398,9 @@ class RFPAnalyzer:
     def extract_document_requirements(self, text: str) -> List[str]:
         """Extract required documents"""
         doc_patterns = [
-            r'(?:submit|provide|include|upload).*?(?:budget|financial|audit|form 990)',
+            r'(?:submit|provide|include|upload).{0,200}?(?:budget|financial|audit|form 990)',
             r'(?:letter of|certificate|license|permit)',
-            r'(?:tax-exempt|501\(c\)\(3\)).*?(?:letter|determination|status)',
+            r'(?:tax-exempt|501\(c\)\(3\)).{0,200}?(?:letter|determination|status)',
         ]
         
         documents = []
@@ -271,9 +449,9 @@ class RFPAnalyzer:
         
         # Look for tip indicators
         tip_patterns = [
-            r'(?:successful|competitive|strong).*?(?:applications|proposals)',
-            r'(?:tips?|recommendations?|suggestions?).*?(?:for|include)',
-            r'(?:review.*?will|we look for|consider)',
+            r'(?:successful|competitive|strong).{0,200}?(?:applications|proposals)',
+            r'(?:tips?|recommendations?|suggestions?).{0,200}?(?:for|include)',
+            r'(?:review.{0,200}?will|we look for|consider)',
         ]
         
         for pattern in tip_patterns:
@@ -290,6 +468,98 @@ class RFPAnalyzer:
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def save_upload(file) -> Tuple[str, str]:
+    """Save an uploaded file under a timestamped name and return (filename, path)"""
+    filename = secure_filename(file.filename)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"{timestamp}_{filename}"
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(file_path)
+    return filename, file_path
+
+def analyze_file(file_path: str, tier: Optional[str] = None) -> Dict:
+    """Extract and analyze an uploaded file within the configured resource limits"""
+    tier = tier if tier in EXTRACTION_TIERS else app.config['EXTRACTION_TIER']
+    budget = AnalysisBudget(stage_limits={
+        'extraction': app.config['EXTRACTION_TIME_BUDGET'],
+        'analysis': app.config['ANALYSIS_TIME_BUDGET'],
+    })
+    analyzer = RFPAnalyzer(
+        max_pages=app.config['ANALYSIS_MAX_PAGES'],
+        max_chars=app.config['ANALYSIS_MAX_CHARS'],
+        budget=budget,
+        quick_leading_pages=app.config['QUICK_TIER_LEADING_PAGES'],
+        quick_max_pages=app.config['QUICK_TIER_MAX_PAGES'],
+    )
+    
+    with ResourceUsage(os.path.basename(file_path)):
+        text = analyzer.extract_text_from_file(file_path, quick=(tier == 'quick'))
+        analysis = analyzer.analyze_rfp(text)
+        
+        # Fall back to every page when the quick tier missed the key details. Pages
+        # the quick pass extracted are reused, and the budget keeps each stage's
+        # original deadline, so this only uses what is left
+        if analyzer.extraction_tier == 'quick' and analyzer.needs_full_extraction(analysis):
+            analyzer.truncation_reasons = []
+            text = analyzer.extract_text_from_file(file_path)
+            analysis = analyzer.analyze_rfp(text)
+    
+    analysis['extraction_tier'] = analyzer.extraction_tier
+    return analysis
+
+def get_db() -> AnalysisDatabase:
+    """Return the analysis database for the configured path"""
+    db_path = app.config['DATABASE_PATH']
+    if db_path not in _databases:
+        _databases[db_path] = AnalysisDatabase(db_path)
+    return _databases[db_path]
+
+def save_analysis(filename: str, analysis: Dict) -> int:
+    """Persist an analysis and return its id"""
+    return get_db().save_analysis(filename, analysis['title'], analysis['organization'], analysis)
+
+def analysis_template_version() -> str:
+    """Hash of the templates that make up an analysis page, so markup changes change the ETag"""
+    digest = hashlib.sha256()
+    for name in ('base.html', 'analysis.html', 'analysis_body.html'):
+        source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, name)
+        digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+def get_analysis_fragment(analysis_id: int) -> Optional[Dict]:
+    """Return the rendered analysis body for a stored analysis, cached by id"""
+    cache_key = (app.config['DATABASE_PATH'], analysis_id)
+    fragment = analysis_fragment_cache.get(cache_key)
+    if fragment is not None:
+        return fragment
+    
+    record = get_db().get_analysis(analysis_id)
+    if record is None:
+        return None
+    
+    html = render_template('analysis_body.html', analysis=record['analysis_data'],
+                           filename=record['filename'])
+    # Stored analyses never change, so the record plus the page templates identify the content
+    record_json = json.dumps(record, sort_keys=True) + analysis_template_version()
+    # SQLite CURRENT_TIMESTAMP is stored in UTC
+    last_modified = datetime.strptime(record['created_at'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    fragment = {
+        'html': html,
+        'etag': hashlib.sha256(record_json.encode('utf-8')).hexdigest(),
+        'last_modified': last_modified,
+    }
+    analysis_fragment_cache.set(cache_key, fragment)
+    return fragment
+
+def get_section_prompts(analysis_id: int, profile: Dict[str, str]) -> Optional[List[Dict]]:
+    """Return section prompts for a stored analysis, or None if it does not exist"""
+    def load_analysis():
+        record = get_db().get_analysis(analysis_id)
+        return record['analysis_data'] if record else None
+    
+    analysis_key = (app.config['DATABASE_PATH'], analysis_id)
+    return prompt_builder.section_prompts(analysis_key, profile, load_analysis)
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -306,23 +576,37 @@ def upload_file():
         return redirect(request.url)
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        
-        # Analyze the RFP
-        analyzer = RFPAnalyzer()
-        text = analyzer.extract_text_from_file(file_path)
-        analysis = analyzer.analyze_rfp(text)
+        filename, file_path = save_upload(file)
         
-        # Store analysis in session or database (for demo, we'll pass it directly)
-        return render_template('analysis.html', analysis=analysis, filename=filename)
+        # Analyze the RFP and store it so the result can be revisited or shared
+        analysis = analyze_file(file_path, request.values.get('tier'))
+        analysis_id = save_analysis(filename, analysis)
+        
+        return redirect(url_for('view_analysis', analysis_id=analysis_id))
     
     flash('Invalid file type. Please upload PDF, DOCX, or TXT files.')
     return redirect(url_for('index'))
 
+@app.route('/analysis/<int:analysis_id>')
+def view_analysis(analysis_id):
+    fragment = get_analysis_fragment(analysis_id)
+    if fragment is None:
+        abort(404)
+    
+    # The layout (flash messages, links) is rendered per request around the cached body
+    has_flashes = bool(get_flashed_messages())
+    response = make_response(render_template('analysis.html', analysis_body=fragment['html']))
+    if has_flashes:
+        response.cache_control.no_store = True
+        return response
+    
+    # Weak: the per-request layout around the cached body may differ byte-for-byte
+    response.set_etag(fragment['etag'], weak=True)
+    response.last_modified = fragment['last_modified']
+    response.cache_control.private = True
+    response.cache_control.max_age = app.config['ANALYSIS_CACHE_MAX_AGE']
+    return response.make_conditional(request)
+
 @app.route('/generate_prompt')
 def generate_prompt():
     # This route can be used to generate LLM prompts
@@ -338,17 +622,80 @@ def api_analyze():
     if not allowed_file(file.filename):
         return jsonify({'error': 'Invalid file type'}), 400
     
-    filename = secure_filename(file.filename)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"{timestamp}_{filename}"
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    filename, file_path = save_upload(file)
+    
+    analysis = analyze_file(file_path, request.values.get('tier'))
+    analysis_id = save_analysis(filename, analysis)
+    
+    return jsonify(dict(analysis, id=analysis_id))
+
+def is_analysis_id(value) -> bool:
+    """Check for an integer id; bool is an int subclass but never a valid id"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def parse_organization_profile(data: Dict):
+    """Return (profile, None) for a valid organization object, else (None, error response)"""
+    organization = data.get('organization')
+    if organization is None:
+        organization = {}
+    if not isinstance(organization, dict):
+        return None, (jsonify({'error': 'organization must be a JSON object'}), 400)
+    
+    profile = normalize_profile(organization)
+    errors = RFPValidator.validate_form_data(profile)
+    if errors:
+        return None, (jsonify({'error': 'Invalid organization details', 'errors': errors}), 400)
+    
+    return profile, None
+
+@app.route('/api/prompts', methods=['POST'])
+def api_prompts():
+    """Generate section prompts for a stored analysis and organization profile"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    analysis_id = data.get('analysis_id')
+    if not is_analysis_id(analysis_id):
+        return jsonify({'error': 'analysis_id must be an integer'}), 400
+    
+    profile, error_response = parse_organization_profile(data)
+    if error_response is not None:
+        return error_response
+    
+    prompts = get_section_prompts(analysis_id, profile)
+    if prompts is None:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    return jsonify({'analysis_id': analysis_id, 'prompts': prompts})
+
+@app.route('/api/prompts/batch', methods=['POST'])
+def api_prompts_batch():
+    """Generate section prompts for many stored analyses with one organization profile"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    
+    analysis_ids = data.get('analysis_ids')
+    if not isinstance(analysis_ids, list) or not all(is_analysis_id(i) for i in analysis_ids):
+        return jsonify({'error': 'analysis_ids must be a list of integers'}), 400
+    
+    if len(analysis_ids) > app.config['PROMPT_BATCH_LIMIT']:
+        return jsonify({'error': f"Batch size cannot exceed {app.config['PROMPT_BATCH_LIMIT']}"}), 400
+    
+    profile, error_response = parse_organization_profile(data)
+    if error_response is not None:
+        return error_response
     
-    analyzer = RFPAnalyzer()
-    text = analyzer.extract_text_from_file(file_path)
-    analysis = analyzer.analyze_rfp(text)
+    results = []
+    for analysis_id in analysis_ids:
+        prompts = get_section_prompts(analysis_id, profile)
+        if prompts is None:
+            results.append({'analysis_id': analysis_id, 'error': 'Analysis not found'})
+        else:
+            results.append({'analysis_id': analysis_id, 'prompts': prompts})
     
-    return jsonify(analysis)
+    return jsonify({'results': results})
 
 if __name__ == '__main__':
     app.run(debug=True)
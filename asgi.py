@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the RFP Analyzer application
+
+Run with:  uvicorn asgi:application
+
+Upload receipt, database access and response streaming happen on the event
+loop (blocking calls are moved to threads). The number of uploads being
+received at once is bounded separately from analysis, which runs in a
+bounded worker pool with admission control. Every other route is served by
+the Flask app through a small WSGI bridge.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from werkzeug.formparser import parse_form_data
+from app import app, allowed_file, analyze_file, save_analysis, save_upload
+
+logger = logging.getLogger(__name__)
+
+# Uploads larger than this are spooled to disk while being received
+SPOOL_MAX_SIZE = 1024 * 1024
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its body has been received"""
+
+class AdmissionLimit:
+    """Count in-flight work and refuse more once a fixed capacity is reached.
+
+    Only touched from the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+
+    @property
+    def full(self) -> bool:
+        return self.in_flight >= self.capacity
+
+    def admit(self) -> bool:
+        """Reserve a slot, or return False when all slots are taken"""
+        if self.full:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        """Free a slot reserved by admit()"""
+        self.in_flight -= 1
+
+class AnalysisExecutor:
+    """Bounded pool for CPU-heavy extraction and analysis.
+
+    At most ``max_workers`` analyses run at once and at most ``max_queue``
+    more may wait for a worker. A slot is reserved only when a job is ready
+    to submit, and jobs beyond capacity are refused so overload sheds work
+    instead of queueing it. If a worker process dies, the broken pool is
+    replaced so later jobs are not refused until a restart.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, use_processes: bool = True):
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self.executor = self._create_executor()
+        self.slots = AdmissionLimit(max_workers + max_queue)
+
+    def _create_executor(self):
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    @property
+    def full(self) -> bool:
+        """Whether a new job would be refused right now (does not reserve a slot)"""
+        return self.slots.full
+
+    def admit(self) -> bool:
+        """Reserve a slot for a job, or return False when the pool is full"""
+        return self.slots.admit()
+
+    def release(self):
+        """Free a slot reserved by admit()"""
+        self.slots.release()
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            return await loop.run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Several jobs fail together when a worker dies; only rebuild once
+            if self.executor is executor:
+                logger.error("Analysis worker died; replacing the process pool")
+                executor.shutdown(wait=False)
+                self.executor = self._create_executor()
+            raise
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+analysis_executor = AnalysisExecutor(
+    max_workers=app.config['ASGI_ANALYSIS_WORKERS'],
+    max_queue=app.config['ASGI_ANALYSIS_QUEUE'],
+    use_processes=app.config['ASGI_USE_PROCESSES'],
+)
+
+# Uploads whose bodies are still arriving; slow clients hold these, not analysis slots
+upload_slots = AdmissionLimit(app.config['ASGI_MAX_CONCURRENT_UPLOADS'])
+
+def build_environ(scope: Dict, body, content_length: int) -> Dict:
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    environ['CONTENT_LENGTH'] = str(content_length)
+    return environ
+
+async def read_body(receive, limit: Optional[int]):
+    """Receive the request body into a spooled file; None if it exceeds limit"""
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if limit is not None and size > limit:
+            body.close()
+            return None, size
+        body.write(chunk)
+        more_body = message.get('more_body', False)
+
+    body.seek(0)
+    return body, size
+
+async def send_start(send, status: int, headers: List[Tuple[str, str]]):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+
+async def send_response(send, status: int, headers: List[Tuple[str, str]], chunks: List[bytes]):
+    """Send a complete response whose body is already in memory"""
+    await send_start(send, status, headers)
+    for chunk in chunks:
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def send_json(send, status: int, data: Dict, headers: Optional[List[Tuple[str, str]]] = None):
+    body = json.dumps(data).encode('utf-8')
+    headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))] + (headers or [])
+    await send_response(send, status, headers, [body])
+
+async def send_busy(send):
+    await send_json(send, 503, {'error': 'Server is busy, please retry shortly'}, [('Retry-After', '5')])
+
+async def send_analysis_failed(scope: Dict, send):
+    if scope['path'] == '/api/analyze':
+        await send_json(send, 500, {'error': 'Analysis failed'})
+    else:
+        body = b'Analysis failed, please try again'
+        await send_response(send, 500, [('Content-Type', 'text/plain'), ('Content-Length', str(len(body)))], [body])
+
+def save_form_upload(environ: Dict) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Parse the multipart body and save a valid upload, or return None.
+
+    Returns (filename, file_path, tier) where tier comes from the form or query string.
+    """
+    _, form, files = parse_form_data(environ)
+    file = files.get('file')
+    if file is None or not file.filename or not allowed_file(file.filename):
+        return None
+    tier = form.get('tier') or parse_qs(environ['QUERY_STRING']).get('tier', [None])[0]
+    return save_upload(file) + (tier,)
+
+async def stream_wsgi(environ: Dict, send):
+    """Run the Flask app on worker threads, sending each body chunk as it is produced"""
+    loop = asyncio.get_running_loop()
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = headers
+
+    result = await loop.run_in_executor(None, app, environ, start_response)
+    iterator = iter(result)
+    try:
+        # Generator responses may only call start_response once iteration begins
+        chunk = await loop.run_in_executor(None, next, iterator, None)
+        await send_start(send, response['status'], response['headers'])
+        while chunk is not None:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await loop.run_in_executor(None, next, iterator, None)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            await loop.run_in_executor(None, result.close)
+
+async def handle_wsgi(scope: Dict, receive, send):
+    """Serve a request through the Flask app"""
+    body, size = await read_body(receive, app.config['MAX_CONTENT_LENGTH'])
+    if body is None:
+        await send_json(send, 413, {'error': 'Request body too large'})
+        return
+
+    try:
+        await stream_wsgi(build_environ(scope, body, size), send)
+    finally:
+        body.close()
+
+async def receive_upload(scope: Dict, receive, send) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Receive and save an upload, or send the error response and return None"""
+    # Refuse before taking the body when analysis is already saturated; the
+    # analysis slot itself is only reserved once the upload is ready to submit
+    if analysis_executor.full or not upload_slots.admit():
+        await send_busy(send)
+        return None
+
+    try:
+        body, size = await read_body(receive, app.config['MAX_CONTENT_LENGTH'])
+        if body is None:
+            await send_json(send, 413, {'error': 'Request body too large'})
+            return None
+
+        try:
+            loop = asyncio.get_running_loop()
+            upload = await loop.run_in_executor(None, save_form_upload, build_environ(scope, body, size))
+            if upload is None:
+                # Let Flask produce its usual error response from the buffered body
+                body.seek(0)
+                await stream_wsgi(build_environ(scope, body, size), send)
+            return upload
+        finally:
+            body.close()
+    finally:
+        upload_slots.release()
+
+async def handle_analysis_upload(scope: Dict, receive, send):
+    """Receive an upload, analyze it in the worker pool and store the result"""
+    upload = await receive_upload(scope, receive, send)
+    if upload is None:
+        return
+
+    filename, file_path, tier = upload
+    if not analysis_executor.admit():
+        os.remove(file_path)
+        await send_busy(send)
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+        analysis = await analysis_executor.run(analyze_file, file_path, tier)
+        analysis_id = await loop.run_in_executor(None, save_analysis, filename, analysis)
+    except Exception:
+        logger.exception("Analysis of %s failed", filename)
+        await send_analysis_failed(scope, send)
+        return
+    finally:
+        analysis_executor.release()
+
+    if scope['path'] == '/api/analyze':
+        await send_json(send, 200, dict(analysis, id=analysis_id))
+    else:
+        location = f"{scope.get('root_path', '')}/analysis/{analysis_id}"
+        await send_response(send, 302, [('Location', location), ('Content-Length', '0')], [])
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            analysis_executor.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """ASGI application callable"""
+    if scope['type'] == 'lifespan':
+        await handle_lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        raise ValueError(f"Unsupported scope type: {scope['type']}")
+
+    try:
+        if scope['method'] == 'POST' and scope['path'] in ('/upload', '/api/analyze'):
+            await handle_analysis_upload(scope, receive, send)
+        else:
+            await handle_wsgi(scope, receive, send)
+    except ClientDisconnected:
+        pass
+
+if __name__ == '__main__':
+    import uvicorn
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    uvicorn.run(
+        'asgi:application',
+        host=os.getenv('HOST', '127.0.0.1'),
+        port=int(os.getenv('PORT', 5000)),
+    )
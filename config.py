@@ -5,11 +5,18 @@ class Config:
     """Base configuration class"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
+    DATABASE_PATH = os.environ.get('DATABASE_PATH') or 'rfp_analysis.db'
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     
     # File upload settings
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'txt'}
     
+    # Analysis resource limits
+    ANALYSIS_MAX_PAGES = int(os.environ.get('ANALYSIS_MAX_PAGES', 200))
+    ANALYSIS_MAX_CHARS = int(os.environ.get('ANALYSIS_MAX_CHARS', 500000))
+    EXTRACTION_TIME_BUDGET = float(os.environ.get('EXTRACTION_TIME_BUDGET', 20.0))
+    ANALYSIS_TIME_BUDGET = float(os.environ.get('ANALYSIS_TIME_BUDGET', 10.0))
+    
     # Session settings
     PERMANENT_SESSION_LIFETIME = timedelta(hours=2)
     
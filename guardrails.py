@@ -0,0 +1,102 @@
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+class AnalysisBudget:
+    """Per-stage time budgets with cooperative cancellation.
+
+    Long-running loops (PDF pages, DOCX paragraphs, analysis extractors) call
+    ``expired()`` between units of work and stop early once the active
+    stage's deadline has passed.
+    """
+
+    def __init__(self, stage_limits: Optional[Dict[str, float]] = None, default_limit: Optional[float] = None):
+        self.stage_limits = stage_limits or {}
+        self.default_limit = default_limit
+        self.stage = None
+        self.deadline = None
+        self.deadlines: Dict[str, Optional[float]] = {}
+
+    def start(self, stage: str):
+        """Start the clock for a named stage.
+
+        Starting a stage again (e.g. a retry) resumes its original deadline
+        rather than granting a fresh budget.
+        """
+        if stage not in self.deadlines:
+            limit = self.stage_limits.get(stage, self.default_limit)
+            self.deadlines[stage] = time.monotonic() + limit if limit is not None else None
+        self.stage = stage
+        self.deadline = self.deadlines[stage]
+
+    def expired(self) -> bool:
+        """Check whether the active stage has run past its budget"""
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+def current_rss_mb() -> Optional[float]:
+    """Current resident set size of this process, where /proc is available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def format_mb(value: Optional[float]) -> str:
+    return f"{value:.1f}MB" if value is not None else "n/a"
+
+class ResourceUsage:
+    """Record wall time, CPU time and memory for a single request.
+
+    CPU time is measured for the calling thread only, so overlapping requests
+    on other threads are not counted. RSS and peak RSS are process-wide: the
+    start/end delta approximates this request's footprint when requests do not
+    overlap, and peak RSS is the process's lifetime high-water mark.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rss_start_mb = None
+        self.rss_end_mb = None
+        self.peak_rss_mb = None
+
+    def __enter__(self):
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self.rss_start_mb = current_rss_mb()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.thread_time() - self._cpu_start
+        self.rss_end_mb = current_rss_mb()
+        if resource is not None:
+            # ru_maxrss is reported in KB on Linux
+            self.peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        if self.rss_start_mb is not None and self.rss_end_mb is not None:
+            rss_delta = f"{self.rss_end_mb - self.rss_start_mb:+.1f}MB"
+        else:
+            rss_delta = "n/a"
+        logger.info(
+            "Resource usage for %s: wall=%.3fs thread_cpu=%.3fs rss_start=%s rss_end=%s "
+            "rss_delta=%s process_peak_rss=%s",
+            self.label,
+            self.wall_seconds,
+            self.cpu_seconds,
+            format_mb(self.rss_start_mb),
+            format_mb(self.rss_end_mb),
+            rss_delta,
+            format_mb(self.peak_rss_mb),
+        )
+        return False
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load-test harness comparing the WSGI and ASGI serving paths
+
+Starts each server in a subprocess, sends concurrent mixed-size uploads to
+/api/analyze and reports p50/p99 latency for each. Servers started here
+store their database and uploads in a temporary directory that is removed
+afterwards:
+
+    python loadtest.py --requests 200 --concurrency 16
+    python loadtest.py --target asgi
+    python loadtest.py --url http://localhost:5000   # an already running server
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+SERVER_COMMANDS = {
+    'wsgi': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--with-threads', '--port', '{port}'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:application', '--log-level', 'warning', '--port', '{port}'],
+}
+
+# (label, approximate document size in bytes, share of requests)
+UPLOAD_MIX = [
+    ('small', 2 * 1024, 0.6),
+    ('medium', 100 * 1024, 0.3),
+    ('large', 450 * 1024, 0.1),
+]
+
+SAMPLE_PARAGRAPH = (
+    "Request for Proposal: Community Youth Education Initiative. "
+    "Grants up to $50,000 available per grant. Applicants must be a 501(c)(3) nonprofit "
+    "located in Alameda County. Applications due by March 15, 2025. "
+    "Successful applications will demonstrate measurable outcomes for youth ages 12-18.\n"
+)
+
+def make_document(size: int) -> bytes:
+    repeats = max(1, size // len(SAMPLE_PARAGRAPH))
+    return (SAMPLE_PARAGRAPH * repeats).encode('utf-8')
+
+def encode_upload(content: bytes, filename: str) -> Tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode('utf-8') + content + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+def send_upload(url: str, body: bytes, content_type: str) -> Tuple[int, float]:
+    """POST one upload and return (status, latency in seconds)"""
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=120)
+    start = time.perf_counter()
+    try:
+        conn.request('POST', '/api/analyze', body=body, headers={'Content-Type': content_type})
+        response = conn.getresponse()
+        response.read()
+        status = response.status
+    except OSError:
+        status = 0
+    finally:
+        conn.close()
+    return status, time.perf_counter() - start
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+def run_load(url: str, requests: int, concurrency: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    documents = {label: make_document(size) for label, size, _ in UPLOAD_MIX}
+    labels = rng.choices([m[0] for m in UPLOAD_MIX], weights=[m[2] for m in UPLOAD_MIX], k=requests)
+    uploads = [encode_upload(documents[label], f"{label}.txt") for label in labels]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda upload: send_upload(url, *upload), uploads))
+    elapsed = time.perf_counter() - start
+
+    ok = [latency for status, latency in results if status == 200]
+    return {
+        'requests': requests,
+        'ok': len(ok),
+        'rejected': sum(1 for status, _ in results if status == 503),
+        'errors': sum(1 for status, _ in results if status not in (200, 503)),
+        'p50_ms': percentile(ok, 50) * 1000 if ok else None,
+        'p99_ms': percentile(ok, 99) * 1000 if ok else None,
+        'mean_ms': statistics.mean(ok) * 1000 if ok else None,
+        'throughput_rps': len(ok) / elapsed if elapsed else 0.0,
+    }
+
+def run_target(target: str, args) -> Dict:
+    port = free_port()
+    command = [part.format(port=port) for part in SERVER_COMMANDS[target]]
+    storage_dir = tempfile.mkdtemp(prefix=f"rfp_loadtest_{target}_")
+    env = dict(os.environ,
+               DATABASE_PATH=os.path.join(storage_dir, 'rfp_analysis.db'),
+               UPLOAD_FOLDER=os.path.join(storage_dir, 'uploads'))
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        return run_load(f"http://127.0.0.1:{port}", args.requests, args.concurrency, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(storage_dir, ignore_errors=True)
+
+def format_ms(value: Optional[float]) -> str:
+    return f"{value:.1f}" if value is not None else "n/a"
+
+def print_report(results: Dict[str, Dict]):
+    print(f"{'target':<8} {'ok':>6} {'503':>6} {'errors':>6} {'p50 ms':>10} {'p99 ms':>10} {'mean ms':>10} {'req/s':>8}")
+    for target, result in results.items():
+        print(f"{target:<8} {result['ok']:>6} {result['rejected']:>6} {result['errors']:>6} "
+              f"{format_ms(result['p50_ms']):>10} {format_ms(result['p99_ms']):>10} "
+              f"{format_ms(result['mean_ms']):>10} {result['throughput_rps']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['wsgi', 'asgi', 'both'], default='both')
+    parser.add_argument('--url', help='Load-test an already running server instead of starting one')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.url:
+        results = {'url': run_load(args.url, args.requests, args.concurrency, args.seed)}
+    else:
+        targets = ['wsgi', 'asgi'] if args.target == 'both' else [args.target]
+        results = {target: run_target(target, args) for target in targets}
+
+    print_report(results)
+
+if __name__ == '__main__':
+    main()
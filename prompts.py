@@ -0,0 +1,57 @@
+import hashlib
+import json
+from typing import Callable, Dict, List, Optional
+from cache import LRUCache
+
+# Organization fields collected by the prompt generator form
+PROFILE_FIELDS = (
+    'orgName', 'mission', 'targetPop', 'projectTitle',
+    'fundingAmount', 'geoArea', 'projectDesc', 'outcomes',
+)
+
+def normalize_profile(form_data: Dict) -> Dict[str, str]:
+    """Keep only known organization fields, stripped of surrounding whitespace"""
+    return {field: str(form_data.get(field) or '').strip() for field in PROFILE_FIELDS}
+
+def profile_hash(profile: Dict[str, str]) -> str:
+    """Stable hash of an organization profile"""
+    payload = json.dumps(profile, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class PromptBuilder:
+    """Build per-section LLM prompts from stored analyses.
+
+    The compiled section template is reused for every prompt, and the prompts
+    for each (analysis, organization profile) pair are memoized so repeat
+    requests skip both the database and template rendering.
+    """
+    
+    def __init__(self, template, cache_size: int = 1024):
+        self.template = template
+        self.cache = LRUCache(cache_size)
+    
+    def build(self, analysis: Dict, profile: Dict[str, str]) -> List[Dict]:
+        """Render one prompt per application section"""
+        return [
+            {
+                'section': section['title'],
+                'prompt': self.template.render(section=section, analysis=analysis, org=profile)
+            }
+            for section in analysis.get('application_sections', [])
+        ]
+    
+    def section_prompts(self, analysis_key, profile: Dict[str, str],
+                        load_analysis: Callable[[], Optional[Dict]]) -> Optional[List[Dict]]:
+        """Return memoized prompts, loading and rendering the analysis only on a miss"""
+        cache_key = (analysis_key, profile_hash(profile))
+        prompts = self.cache.get(cache_key)
+        if prompts is not None:
+            return prompts
+        
+        analysis = load_analysis()
+        if analysis is None:
+            return None
+        
+        prompts = self.build(analysis, profile)
+        self.cache.set(cache_key, prompts)
+        return prompts
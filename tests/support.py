@@ -0,0 +1,23 @@
+import shutil
+import tempfile
+import os
+from app import app, analysis_fragment_cache, prompt_builder
+
+class IsolatedStorageMixin:
+    """Point the app at a temporary database and upload folder and clear its caches"""
+    
+    def setUp(self):
+        super().setUp()
+        self.storage_dir = tempfile.mkdtemp()
+        self.original_config = {key: app.config[key] for key in ('DATABASE_PATH', 'UPLOAD_FOLDER')}
+        app.config['DATABASE_PATH'] = os.path.join(self.storage_dir, 'rfp_analysis.db')
+        app.config['UPLOAD_FOLDER'] = self.storage_dir
+        analysis_fragment_cache.clear()
+        prompt_builder.cache.clear()
+    
+    def tearDown(self):
+        app.config.update(self.original_config)
+        analysis_fragment_cache.clear()
+        prompt_builder.cache.clear()
+        shutil.rmtree(self.storage_dir, ignore_errors=True)
+        super().tearDown()
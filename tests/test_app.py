@@ -1,13 +1,44 @@
 import unittest
 import tempfile
 import os
-from app import app, RFPAnalyzer
+import PyPDF2
+from unittest import mock
+from app import app, RFPAnalyzer, analyze_file
+from support import IsolatedStorageMixin
 
-class RFPAnalyzerTestCase(unittest.TestCase):
+def build_pdf(page_texts, array_contents=False):
+    """Build a minimal PDF with one line of text per page"""
+    page_count = len(page_texts)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            ' '.join(f"{4 + 2 * i} 0 R" for i in range(page_count)), page_count)).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        contents = f"[{5 + 2 * i} 0 R]" if array_contents else f"{5 + 2 * i} 0 R"
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                        f"/Resources << /Font << /F1 3 0 R >> >> /Contents {contents} >>").encode())
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return pdf
+
+class RFPAnalyzerTestCase(IsolatedStorageMixin, unittest.TestCase):
     """Test cases for RFP Analyzer"""
     
     def setUp(self):
         """Set up test fixtures"""
+        super().setUp()
         self.app = app.test_client()
         self.app.testing = True
         
@@ -47,6 +78,232 @@ class RFPAnalyzerTestCase(unittest.TestCase):
         dates = extract_dates(text)
         self.assertTrue(len(dates) >= 1)
     
+    def test_extraction_character_cap(self):
+        """Test text extraction stops at the character cap and marks truncation"""
+        analyzer = RFPAnalyzer(max_chars=100)
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write("Request for Proposal " * 50)
+        try:
+            text = analyzer.extract_text_from_file(f.name)
+        finally:
+            os.unlink(f.name)
+        
+        self.assertEqual(len(text), 100)
+        analysis = analyzer.analyze_rfp(text)
+        self.assertTrue(analysis['truncated'])
+    
+    def test_analysis_time_budget(self):
+        """Test stages are skipped once the analysis budget is exhausted"""
+        from guardrails import AnalysisBudget
+        
+        analyzer = RFPAnalyzer(budget=AnalysisBudget(default_limit=-1))
+        analysis = analyzer.analyze_rfp("Grants up to $50,000 available for youth programs.")
+        self.assertTrue(analysis['truncated'])
+        self.assertEqual(analysis['funding_amount'], "Amount not specified")
+        self.assertEqual(analysis['requirements']['financial'], [])
+    
+    def test_pathological_input_is_bounded(self):
+        """Test a long single line of repeated trigger words is analyzed in linear time"""
+        import time
+        from guardrails import AnalysisBudget
+        
+        analyzer = RFPAnalyzer(budget=AnalysisBudget(stage_limits={'analysis': 1.0}))
+        start = time.perf_counter()
+        analyzer.analyze_rfp('serve ' * 20000)
+        self.assertLess(time.perf_counter() - start, 10.0)
+    
+    def test_budget_not_renewed_on_restart(self):
+        """Test restarting a stage resumes its original deadline"""
+        import time
+        from guardrails import AnalysisBudget
+        
+        budget = AnalysisBudget(stage_limits={'extraction': 0.05})
+        budget.start('extraction')
+        time.sleep(0.06)
+        budget.start('extraction')
+        self.assertTrue(budget.expired())
+    
+    def test_analysis_persisted_and_cached(self):
+        """Test uploads are stored and served with conditional caching headers"""
+        import io
+        
+        rv = self.app.post('/upload', data={
+            'file': (io.BytesIO(b"Request for Proposal\nGrants up to $50,000 available."), 'rfp.txt')
+        })
+        self.assertEqual(rv.status_code, 302)
+        self.assertIn('/analysis/', rv.headers['Location'])
+        analysis_path = rv.headers['Location']
+        
+        rv = self.app.get(analysis_path)
+        self.assertEqual(rv.status_code, 200)
+        self.assertIn(b'up to $50,000', rv.data)
+        self.assertIsNotNone(rv.headers.get('ETag'))
+        self.assertIsNotNone(rv.headers.get('Last-Modified'))
+        etag = rv.headers['ETag']
+        
+        rv = self.app.get(analysis_path, headers={'If-None-Match': etag})
+        self.assertEqual(rv.status_code, 304)
+        
+        # A template change invalidates the ETag even though the record is unchanged
+        from unittest import mock
+        from app import analysis_fragment_cache
+        analysis_fragment_cache.clear()
+        with mock.patch('app.analysis_template_version', return_value='changed'):
+            rv = self.app.get(analysis_path, headers={'If-None-Match': etag})
+        self.assertEqual(rv.status_code, 200)
+        self.assertNotEqual(rv.headers['ETag'], etag)
+        
+        rv = self.app.get('/analysis/999')
+        self.assertEqual(rv.status_code, 404)
+    
+    def test_flash_messages_not_cached(self):
+        """Test one client's flash message does not leak into another's cached page"""
+        import io
+        
+        rv = self.app.post('/upload', data={
+            'file': (io.BytesIO(b"Request for Proposal\nGrants up to $50,000 available."), 'rfp.txt')
+        })
+        analysis_path = rv.headers['Location']
+        
+        client_a = app.test_client()
+        client_a.post('/upload', data={})
+        rv = client_a.get(analysis_path)
+        self.assertIn(b'No file selected', rv.data)
+        self.assertTrue(rv.cache_control.no_store)
+        
+        client_b = app.test_client()
+        rv = client_b.get(analysis_path)
+        self.assertEqual(rv.status_code, 200)
+        self.assertNotIn(b'No file selected', rv.data)
+        self.assertIn(b'up to $50,000', rv.data)
+    
+    def test_prompt_api(self):
+        """Test section prompts are generated from a stored analysis"""
+        from app import get_db
+        
+        analysis = RFPAnalyzer().analyze_rfp("Request for Proposal\nGrants up to $50,000 available.")
+        analysis_id = get_db().save_analysis('rfp.txt', analysis['title'], analysis['organization'], analysis)
+        organization = {'orgName': 'Youth Learning Alliance', 'fundingAmount': '$25,000'}
+        
+        rv = self.app.post('/api/prompts', json={'analysis_id': analysis_id, 'organization': organization})
+        self.assertEqual(rv.status_code, 200)
+        prompts = rv.get_json()['prompts']
+        self.assertEqual(len(prompts), len(analysis['application_sections']))
+        self.assertIn('Youth Learning Alliance', prompts[0]['prompt'])
+        self.assertIn(prompts[0]['section'], prompts[0]['prompt'])
+        
+        rv = self.app.post('/api/prompts', json={'analysis_id': analysis_id, 'organization': {}})
+        self.assertEqual(rv.status_code, 400)
+        self.assertIn('orgName', rv.get_json()['errors'])
+        
+        rv = self.app.post('/api/prompts/batch', json={
+            'analysis_ids': [analysis_id, 999], 'organization': organization
+        })
+        self.assertEqual(rv.status_code, 200)
+        results = rv.get_json()['results']
+        self.assertEqual(results[0]['prompts'], prompts)
+        self.assertEqual(results[1]['error'], 'Analysis not found')
+    
+    def test_prompt_api_rejects_malformed_requests(self):
+        """Test wrong-shaped JSON bodies get 400 instead of a server error"""
+        organization = {'orgName': 'Youth Learning Alliance'}
+        bad_requests = [
+            ('/api/prompts', [1, 2]),
+            ('/api/prompts', {'analysis_id': True, 'organization': organization}),
+            ('/api/prompts', {'analysis_id': 1, 'organization': ['x']}),
+            ('/api/prompts', {'analysis_id': 1, 'organization': 'abc'}),
+            ('/api/prompts/batch', [1, 2]),
+            ('/api/prompts/batch', {'analysis_ids': [True], 'organization': organization}),
+            ('/api/prompts/batch', {'analysis_ids': [1], 'organization': 5}),
+        ]
+        for path, body in bad_requests:
+            rv = self.app.post(path, json=body)
+            self.assertEqual(rv.status_code, 400, (path, body))
+    
+    def test_quick_extraction_tier(self):
+        """Test the quick tier extracts leading and keyword-flagged PDF pages only"""
+        pages = ["Request for Proposal"] + ["General background"] * 8 + [
+            "Applicants must be eligible 501(c)(3) nonprofit organizations",
+            "Grants up to $50,000 total. Applications due by March 15, 2025",
+        ]
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(build_pdf(pages))
+        try:
+            analyzer = RFPAnalyzer(quick_leading_pages=1, quick_max_pages=5)
+            quick_text = analyzer.extract_text_from_file(f.name, quick=True)
+            self.assertEqual(analyzer.extraction_tier, 'quick')
+            self.assertNotIn('General background', quick_text)
+            self.assertIn('$50,000', quick_text)
+            analysis = analyzer.analyze_rfp(quick_text)
+            self.assertFalse(analyzer.needs_full_extraction(analysis))
+            self.assertTrue(analysis['truncated'])
+            self.assertIn("quick tier: 3 of 11 pages extracted", analysis['truncation_reasons'])
+            
+            full_text = analyzer.extract_text_from_file(f.name)
+            self.assertEqual(analyzer.extraction_tier, 'full')
+            self.assertIn('General background', full_text)
+        finally:
+            os.unlink(f.name)
+        
+        # Pages whose /Contents is an array of streams are scanned too
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(build_pdf(pages, array_contents=True))
+        try:
+            analyzer = RFPAnalyzer(quick_leading_pages=1)
+            self.assertEqual(analyzer.select_quick_pages(PyPDF2.PdfReader(f.name), 5), [0, 9, 10])
+        finally:
+            os.unlink(f.name)
+        
+        # Key terms beyond the page cap are still found; the cap limits pages extracted
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(build_pdf(pages[:9] * 3 + pages[9:]))
+        try:
+            analyzer = RFPAnalyzer(max_pages=10, quick_leading_pages=1, quick_max_pages=5)
+            analysis = analyzer.analyze_rfp(analyzer.extract_text_from_file(f.name, quick=True))
+            self.assertIn('$50,000', analysis['funding_amount'])
+            self.assertIn("quick tier: 3 of 29 pages extracted", analysis['truncation_reasons'])
+        finally:
+            os.unlink(f.name)
+        
+        # Short documents skip the keyword scan and are extracted in full
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(build_pdf(pages))
+        try:
+            analyzer = RFPAnalyzer(quick_leading_pages=1)
+            with mock.patch.object(analyzer, 'select_quick_pages') as select_quick_pages:
+                self.assertIn('General background', analyzer.extract_text_from_file(f.name, quick=True))
+            select_quick_pages.assert_not_called()
+            self.assertEqual(analyzer.extraction_tier, 'full')
+        finally:
+            os.unlink(f.name)
+    
+    def test_quick_tier_fallback_cost(self):
+        """Test falling back to full extraction does not extract any page twice"""
+        extracted = []
+        original_extract_text = PyPDF2.PageObject.extract_text
+        
+        def counting_extract_text(page, *args, **kwargs):
+            text = original_extract_text(page, *args, **kwargs)
+            extracted.append(text)
+            return text
+        
+        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+            f.write(build_pdf(["Request for Proposal"] * 9 + ["Funding notes"]))
+        try:
+            config = {'QUICK_TIER_LEADING_PAGES': 1, 'QUICK_TIER_MAX_PAGES': 2}
+            with mock.patch.dict(app.config, config), \
+                    mock.patch.object(PyPDF2.PageObject, 'extract_text', autospec=True,
+                                      side_effect=counting_extract_text):
+                analysis = analyze_file(f.name, 'quick')
+        finally:
+            os.unlink(f.name)
+        
+        # Too little found in the quick tier, so every page was needed, but only once
+        self.assertEqual(analysis['extraction_tier'], 'full')
+        self.assertEqual(len(extracted), 10)
+        self.assertEqual(extracted.count("Funding notes"), 1)
+        self.assertFalse(any(reason.startswith('quick tier') for reason in analysis['truncation_reasons']))
+    
     def test_prompt_generator_page(self):
         """Test prompt generator page"""
         rv = self.app.get('/generate_prompt')
@@ -0,0 +1,134 @@
+import unittest
+import io
+import os
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from werkzeug.test import EnvironBuilder
+import asgi
+from app import get_db
+from support import IsolatedStorageMixin
+
+class ASGITestCase(IsolatedStorageMixin, unittest.IsolatedAsyncioTestCase):
+    """Test cases for the ASGI entry point"""
+
+    def setUp(self):
+        """Use a thread pool for analysis in each test"""
+        super().setUp()
+        self.original_executor = asgi.analysis_executor
+        asgi.analysis_executor = asgi.AnalysisExecutor(max_workers=1, max_queue=0, use_processes=False)
+
+    def tearDown(self):
+        asgi.analysis_executor.shutdown()
+        asgi.analysis_executor = self.original_executor
+        super().tearDown()
+
+    async def request(self, method, path, body=b'', content_type=None, on_receive=None):
+        """Drive the ASGI app directly and collect the response"""
+        headers = [(b'content-type', content_type.encode('latin-1'))] if content_type else []
+        scope = {'type': 'http', 'method': method, 'path': path, 'root_path': '',
+                 'query_string': b'', 'headers': headers, 'http_version': '1.1'}
+        chunks = [body[i:i + 1024] for i in range(0, len(body), 1024)] or [b'']
+        messages = [{'type': 'http.request', 'body': chunk, 'more_body': i < len(chunks) - 1}
+                    for i, chunk in enumerate(chunks)]
+        response = {'body': b''}
+
+        async def receive():
+            if on_receive is not None:
+                on_receive()
+            return messages.pop(0)
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = dict(message['headers'])
+            else:
+                response['body'] += message.get('body', b'')
+
+        await asgi.application(scope, receive, send)
+        return response
+
+    def multipart(self, content, filename='rfp.txt'):
+        builder = EnvironBuilder(method='POST', data={'file': (io.BytesIO(content), filename)})
+        environ = builder.get_environ()
+        return environ['wsgi.input'].read(), environ['CONTENT_TYPE']
+
+    async def test_api_analyze_stores_analysis(self):
+        """Test uploads are analyzed off the event loop and persisted"""
+        body, content_type = self.multipart(b"Request for Proposal\nGrants up to $50,000 available.")
+        rv = await self.request('POST', '/api/analyze', body, content_type)
+        self.assertEqual(rv['status'], 200)
+        self.assertIn(b'up to $50,000', rv['body'])
+        self.assertIsNotNone(get_db().get_analysis(1))
+
+    async def test_invalid_upload_falls_back_to_flask(self):
+        """Test invalid uploads get the Flask app's error response"""
+        body, content_type = self.multipart(b"not allowed", filename='rfp.exe')
+        rv = await self.request('POST', '/api/analyze', body, content_type)
+        self.assertEqual(rv['status'], 400)
+        self.assertIn(b'Invalid file type', rv['body'])
+
+    async def test_admission_control(self):
+        """Test requests are refused once the worker pool is full"""
+        asgi.analysis_executor.admit()
+        received = []
+        body, content_type = self.multipart(b"Request for Proposal")
+        rv = await self.request('POST', '/api/analyze', body, content_type,
+                                on_receive=lambda: received.append(True))
+        self.assertEqual(rv['status'], 503)
+        self.assertEqual(rv['headers'][b'retry-after'], b'5')
+        self.assertEqual(received, [])  # Refused before the body was read
+
+    async def test_upload_receipt_does_not_hold_analysis_slots(self):
+        """Test analysis slots are reserved only once the body has been received"""
+        slots_during_receipt = []
+        body, content_type = self.multipart(b"Request for Proposal" * 200)
+        rv = await self.request('POST', '/api/analyze', body, content_type,
+                                on_receive=lambda: slots_during_receipt.append(asgi.analysis_executor.slots.in_flight))
+        self.assertEqual(rv['status'], 200)
+        self.assertGreater(len(slots_during_receipt), 1)
+        self.assertEqual(set(slots_during_receipt), {0})
+
+    async def test_concurrent_upload_limit(self):
+        """Test uploads are refused once too many bodies are being received"""
+        original_slots = asgi.upload_slots
+        asgi.upload_slots = asgi.AdmissionLimit(0)
+        try:
+            body, content_type = self.multipart(b"Request for Proposal")
+            rv = await self.request('POST', '/api/analyze', body, content_type)
+        finally:
+            asgi.upload_slots = original_slots
+        self.assertEqual(rv['status'], 503)
+
+    async def test_analysis_error_returns_json(self):
+        """Test a failing analysis gets a JSON 500 and frees its slot"""
+        body, content_type = self.multipart(b"Request for Proposal")
+        with mock.patch('asgi.analyze_file', side_effect=RuntimeError('boom')):
+            rv = await self.request('POST', '/api/analyze', body, content_type)
+        self.assertEqual(rv['status'], 500)
+        self.assertIn(b'Analysis failed', rv['body'])
+        self.assertEqual(asgi.analysis_executor.slots.in_flight, 0)
+
+    async def test_process_pool(self):
+        """Test analysis in worker processes, including recovery from a dead worker"""
+        asgi.analysis_executor.shutdown()
+        asgi.analysis_executor = asgi.AnalysisExecutor(max_workers=1, max_queue=0, use_processes=True)
+
+        body, content_type = self.multipart(b"Request for Proposal\nGrants up to $50,000 available.")
+        rv = await self.request('POST', '/api/analyze', body, content_type)
+        self.assertEqual(rv['status'], 200)
+        self.assertIn(b'up to $50,000', rv['body'])
+
+        with self.assertRaises(BrokenProcessPool):
+            await asgi.analysis_executor.run(os._exit, 1)
+
+        rv = await self.request('POST', '/api/analyze', body, content_type)
+        self.assertEqual(rv['status'], 200)
+
+    async def test_other_routes_served_by_flask(self):
+        """Test non-upload routes pass through the WSGI bridge"""
+        rv = await self.request('GET', '/')
+        self.assertEqual(rv['status'], 200)
+        self.assertIn(b'RFP Document Analyzer', rv['body'])
+
+if __name__ == '__main__':
+    unittest.main()
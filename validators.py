@@ -1,5 +1,6 @@
 import re
 from typing import Dict, List, Tuple
+from utils import allowed_file
 
 class RFPValidator:
     """Validation class for RFP analysis inputs"""
@@ -47,7 +48,7 @@ class RFPValidator:
         
         # Funding amount validation
         funding = form_data.get('fundingAmount', '').strip()
-        if funding and not re.match(r'^\$?[\d,]+(?:\.\d{2})?, funding):
+        if funding and not re.match(r'^\$?[\d,]+(?:\.\d{2})?$', funding):
             errors.setdefault('fundingAmount', []).append("Invalid funding amount format")
         
         return errors